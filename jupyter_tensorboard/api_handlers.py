@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import cProfile
 import json
+import marshal
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from tornado import web
-from notebook.base.handlers import APIHandler
+from tornado import gen, web
+from notebook.base.handlers import APIHandler, IPythonHandler
 
+from .daemon import DaemonProxyMixin
 from .handlers import notebook_dir
+from .tracing import sample_stacks
 
 
 def _trim_notebook_dir(dir):
@@ -67,8 +72,93 @@ class TbInstanceHandler(APIHandler):
         manager = self.settings["tensorboard_manager"]
         if name in manager:
             manager.terminate(name, force=True)
+            self.settings["tensorboard_rate_limiter"].forget_instance(name)
             self.set_status(204)
             self.finish()
         else:
             raise web.HTTPError(
                 404, "TensorBoard instance not found: %r" % name)
+
+
+class TbDaemonHandler(DaemonProxyMixin, APIHandler):
+    """Forward the tensorboard api to the host wide daemon."""
+
+    SUPPORTED_METHODS = ('GET', 'POST', 'DELETE')
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self, path):
+        yield self.forward_to_daemon("/api/tensorboard" + path)
+
+    @web.authenticated
+    @gen.coroutine
+    def post(self, path):
+        data = self.get_json_body()
+        # the daemon has no notebook_dir to resolve relative logdirs against
+        if not os.path.isabs(data["logdir"]) and notebook_dir:
+            data["logdir"] = os.path.join(notebook_dir, data["logdir"])
+        yield self.forward_to_daemon(
+            "/api/tensorboard" + path, body=json.dumps(data))
+
+    @web.authenticated
+    @gen.coroutine
+    def delete(self, path):
+        yield self.forward_to_daemon("/api/tensorboard" + path)
+        if self.get_status() == 204:
+            self.settings["tensorboard_rate_limiter"].forget_instance(
+                path.lstrip("/"))
+
+
+class TbProfileHandler(IPythonHandler):
+    """Profile the server for a few seconds and download the result.
+
+    ``mode=stack`` samples the stacks of every thread, including the
+    reload threads, into folded stacks. ``mode=cprofile`` runs cProfile
+    on the thread serving requests and returns a pstats dump.
+    """
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self):
+        tracer = self.settings["tensorboard_tracer"]
+        if not tracer.enabled:
+            raise web.HTTPError(404)
+
+        mode = self.get_argument("mode", "stack")
+        if mode not in ("stack", "cprofile"):
+            raise web.HTTPError(400, "Unknown profile mode: %r" % mode)
+        try:
+            seconds = float(self.get_argument("seconds", "10"))
+        except ValueError:
+            raise web.HTTPError(400, "seconds must be a number")
+        if not 0 < seconds <= tracer.max_profile_seconds:
+            raise web.HTTPError(
+                400, "seconds must be within (0, %d]"
+                % tracer.max_profile_seconds)
+        if tracer.profiling:
+            raise web.HTTPError(409, "A profile is already running")
+
+        tracer.profiling = True
+        try:
+            if mode == "cprofile":
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield gen.sleep(seconds)
+                finally:
+                    profiler.disable()
+                profiler.create_stats()
+                data = marshal.dumps(profiler.stats)
+                filename = "tensorboard.prof"
+            else:
+                with ThreadPoolExecutor(1) as executor:
+                    data = yield executor.submit(
+                        sample_stacks, seconds, tracer.sample_interval)
+                filename = "tensorboard.folded"
+        finally:
+            tracer.profiling = False
+
+        self.set_header("Content-Type", "application/octet-stream")
+        self.set_header(
+            "Content-Disposition", 'attachment; filename="%s"' % filename)
+        self.finish(data)
@@ -3,9 +3,13 @@
 import copy
 import sys
 
+from jupyter_core.application import JupyterApp
 from notebook import nbextensions, serverextensions, extensions
 
 from . import __version__, __name__ as _pkg_name
+from .daemon import TensorboardDaemon
+from .memory import TensorboardMemoryBudget
+from .tracing import TensorboardTracer
 
 
 class ToggleJupyterTensorboardApp(
@@ -84,6 +88,27 @@ class DisableJupyterTensorboardApp(
     _toggle_value = False
 
 
+class DaemonJupyterTensorboardApp(JupyterApp):
+    """App to run the tensorboard daemon shared by the host."""
+
+    name = 'jupyter tensorboard daemon'
+    version = __version__
+    description = (
+        'Run tensorboard instances for all the notebook servers of this '
+        'host, serving them on a Unix socket')
+    config_file_name = 'jupyter_tensorboard_daemon_config'
+    classes = [TensorboardDaemon, TensorboardMemoryBudget, TensorboardTracer]
+    aliases = dict(
+        JupyterApp.aliases, socket='TensorboardDaemon.socket_path',
+        user='TensorboardDaemon.user')
+
+    def start(self):
+        """Serve tensorboard instances until interrupted."""
+        from .tensorboard_manager import manager
+        manager.memory_budget = TensorboardMemoryBudget(parent=self)
+        TensorboardDaemon(parent=self).start()
+
+
 class JupyterTensorboardApp(extensions.BaseExtensionApp):
     """Root level jupyter_nbextensions_configurator app."""
 
@@ -91,7 +116,8 @@ class JupyterTensorboardApp(extensions.BaseExtensionApp):
     version = __version__
     description = (
         'Enable or disable '
-        'the jupyter_tensorboard extension')
+        'the jupyter_tensorboard extension, '
+        'or run the tensorboard daemon')
     subcommands = dict(
         enable=(
             EnableJupyterTensorboardApp,
@@ -99,12 +125,17 @@ class JupyterTensorboardApp(extensions.BaseExtensionApp):
         disable=(
             DisableJupyterTensorboardApp,
             'Disable the jupyter_tensorboard extension.'),
+        daemon=(
+            DaemonJupyterTensorboardApp,
+            'Run the tensorboard daemon shared by the host.'),
     )
     examples = '\n'.join([
         'jupyter tensorboard enable'
         '  # Enable the jupyter_tensorboard extension.',
         'jupyter tensorboard disable'
         ' # Disable the jupyter_tensorboard extension.',
+        'jupyter tensorboard daemon --socket=/run/jupyter-tensorboard.sock'
+        ' # Run the tensorboard daemon shared by the host.',
     ])
 
     def start(self):
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from collections import namedtuple
+
+from jupyter_core.paths import jupyter_data_dir
+from tornado import web
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# index.html is left to the TensorBoard app, which may rewrite it per request
+_SKIPPED_ASSETS = frozenset(["index.html"])
+
+# formats that are already compressed gain nothing from precompression
+_INCOMPRESSIBLE_EXTENSIONS = frozenset([
+    ".gif", ".gz", ".jpeg", ".jpg", ".png", ".woff", ".woff2", ".zip",
+])
+
+_MIN_COMPRESS_SIZE = 1024
+
+ENCODING_EXTENSIONS = (("br", ".br"), ("gzip", ".gz"))
+
+# assets are unpacked per TensorBoard version, but their urls are not
+ASSET_CACHE_MAX_AGE = 24 * 60 * 60
+
+# raised by extract_assets for an unwritable cache or a broken zip, the
+# TensorBoard app then keeps serving the assets itself
+EXTRACT_ERRORS = (IOError, OSError, zipfile.BadZipFile)
+
+TensorboardAssets = namedtuple('TensorboardAssets', ['root', 'paths'])
+
+
+def asset_cache_dir():
+    return os.path.join(jupyter_data_dir(), "tensorboard", "assets")
+
+
+def _should_compress(path, data):
+    ext = os.path.splitext(path)[1].lower()
+    return (len(data) >= _MIN_COMPRESS_SIZE and
+            ext not in _INCOMPRESSIBLE_EXTENSIONS)
+
+
+def _gzip(data):
+    out = io.BytesIO()
+    # mtime=0 keeps the output stable between extractions
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9, mtime=0) as f:
+        f.write(data)
+    return out.getvalue()
+
+
+def _write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows, ``q=0`` ones are
+    refused."""
+    accepted = set()
+    for value in header.split(","):
+        params = [p.strip() for p in value.split(";")]
+        quality = 1.0
+        for param in params[1:]:
+            key, _, number = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if params[0] and quality > 0:
+            accepted.add(params[0].lower())
+    return accepted
+
+
+def _asset_paths(zip_):
+    return frozenset(
+        path for path in zip_.namelist()
+        if not path.endswith("/") and path not in _SKIPPED_ASSETS)
+
+
+def _extract_to(zip_, paths, target):
+    for path in paths:
+        data = zip_.read(path)
+        dest = os.path.join(target, *path.split("/"))
+        if not os.path.isdir(os.path.dirname(dest)):
+            os.makedirs(os.path.dirname(dest))
+        _write_file(dest, data)
+        if _should_compress(path, data):
+            gzipped = _gzip(data)
+            if len(gzipped) < len(data):
+                _write_file(dest + ".gz", gzipped)
+            if brotli is not None:
+                compressed = brotli.compress(data)
+                if len(compressed) < len(data):
+                    _write_file(dest + ".br", compressed)
+
+
+def extract_assets(assets_zip_provider, cache_dir):
+    """Extract the TensorBoard frontend into ``cache_dir`` once per version.
+
+    Each distinct ``webfiles.zip`` is unpacked, alongside gzip and (when the
+    ``brotli`` package is available) brotli encoded copies, into a directory
+    named after its digest, so it is only done again when TensorBoard is
+    upgraded. Returns a ``TensorboardAssets`` or None when there is nothing
+    to serve.
+    """
+    if assets_zip_provider is None:
+        return None
+
+    with assets_zip_provider() as fp:
+        zip_bytes = fp.read()
+    digest = hashlib.sha1(zip_bytes).hexdigest()
+    root = os.path.join(cache_dir, digest)
+
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_:
+        paths = _asset_paths(zip_)
+        if not os.path.isdir(root):
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            logging.info("Extracting TensorBoard assets to %s", root)
+            # extract next to the final location and rename, so concurrent
+            # notebook servers never see a partially written directory
+            tmp_root = tempfile.mkdtemp(
+                prefix=".%s-" % digest, dir=cache_dir)
+            try:
+                # mkdtemp only lets its creator in, the daemon extracts as
+                # root and serves as an unprivileged user
+                os.chmod(tmp_root, 0o755)
+                _extract_to(zip_, paths, tmp_root)
+                os.rename(tmp_root, root)
+            except OSError:
+                shutil.rmtree(tmp_root, ignore_errors=True)
+                if not os.path.isdir(root):
+                    raise
+    return TensorboardAssets(root, paths)
+
+
+def asset_route(assets):
+    """Url pattern, below the server root, of the extracted assets of any
+    instance."""
+    asset_regex = "|".join(re.escape(path) for path in sorted(assets.paths))
+    return r"/tensorboard/(?P<name>\w+)/(?P<path>%s)" % asset_regex
+
+
+class PrecompressedAssetMixin(object):
+    """Serve extracted assets from a ``web.StaticFileHandler`` root,
+    picking the precompressed copy the client accepts."""
+
+    def get_asset(self, path, include_body=True):
+        self.asset_path = path
+        self.content_encoding = None
+        accepted = accepted_encodings(
+            self.request.headers.get("Accept-Encoding", ""))
+        for encoding, ext in ENCODING_EXTENSIONS:
+            if encoding in accepted and os.path.isfile(
+                    os.path.join(self.root, path + ext)):
+                self.content_encoding = encoding
+                path += ext
+                break
+        return web.StaticFileHandler.get(self, path, include_body)
+
+    def set_extra_headers(self, path):
+        self.set_header("Vary", "Accept-Encoding")
+        if self.content_encoding:
+            self.set_header("Content-Encoding", self.content_encoding)
+
+    def get_content_type(self):
+        mime_type, _ = mimetypes.guess_type(self.asset_path)
+        return mime_type or "application/octet-stream"
+
+    def get_cache_time(self, path, modified, mime_type):
+        return ASSET_CACHE_MAX_AGE
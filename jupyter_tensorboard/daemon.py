@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import socket
+import stat
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tornado import gen, httpclient, web
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import Resolver, bind_unix_socket
+from tornado.simple_httpclient import SimpleAsyncHTTPClient
+from tornado.tcpclient import TCPClient
+from tornado.wsgi import WSGIContainer
+from traitlets import Bool, Int, Unicode
+from traitlets.config import LoggingConfigurable
+
+from .assets import (
+    EXTRACT_ERRORS, PrecompressedAssetMixin, asset_route, extract_assets)
+from .tracing import TensorboardTracer
+
+try:
+    import pwd
+except ImportError:
+    # Windows, where the daemon is not supported anyway
+    pwd = None
+
+# host name used in urls sent to the daemon, the socket path is what counts
+DAEMON_HOST = "tensorboard-daemon"
+
+# request and response headers passed through between notebook and daemon
+_FORWARDED_REQUEST_HEADERS = (
+    "Accept", "Accept-Encoding", "Content-Type",
+    "If-Modified-Since", "If-None-Match",
+)
+_FORWARDED_RESPONSE_HEADERS = (
+    "Cache-Control", "Content-Encoding", "Content-Type", "Etag", "Expires",
+    "Last-Modified", "Retry-After", "Vary",
+)
+
+
+class TensorboardDaemon(LoggingConfigurable):
+    """Host wide TensorBoard instances shared by several notebook servers.
+
+    The daemon is started with ``jupyter tensorboard daemon`` and listens on
+    a Unix socket. Notebook servers with ``enabled`` set forward their
+    tensorboard requests to it, so a logdir opened by several users is only
+    loaded once. The daemon identifies each notebook server by the uid of
+    the connecting process and only lets it open logdirs that uid can read.
+    Notebook servers in turn only talk to a socket served by ``uid``.
+
+    Started as root, the daemon switches to ``user`` once its socket is
+    bound, so TensorBoard never loads user controlled logdirs as root.
+    """
+
+    enabled = Bool(False, config=True, help=(
+        "Forward tensorboard requests of this notebook server to the "
+        "daemon listening on socket_path instead of running TensorBoard "
+        "in process."))
+
+    socket_path = Unicode(
+        "/run/jupyter-tensorboard/jupyter-tensorboard.sock", config=True,
+        help=(
+            "Unix socket the daemon listens on. It belongs in a directory "
+            "only the daemon user can write to."))
+
+    uid = Int(0, config=True, help=(
+        "uid the daemon is started as, which its socket keeps after the "
+        "daemon switched to user. Notebook servers refuse to forward "
+        "requests to a socket served by any other user."))
+
+    user = Unicode("nobody", config=True, help=(
+        "User the daemon switches to after binding its socket when started "
+        "as root. TensorBoard only loads what this user can read, so the "
+        "logdirs to share must be readable by it, e.g. through a group."))
+
+    socket_mode = Int(0o666, config=True, help=(
+        "Permissions of the daemon socket, it must be writable by every "
+        "user whose notebook server connects to it."))
+
+    def start(self):
+        if not hasattr(socket, "SO_PEERCRED"):
+            raise RuntimeError(
+                "The tensorboard daemon needs SO_PEERCRED (Linux) to check "
+                "the users connecting to it")
+
+        from .tensorboard_manager import assets_zip_provider, manager
+
+        socket_dir = os.path.dirname(self.socket_path)
+        if not os.path.isdir(socket_dir):
+            os.makedirs(socket_dir, 0o755)
+
+        # next to the socket rather than in the home of whoever started the
+        # daemon, which the daemon user may not be able to read
+        cache_dir = os.path.join(socket_dir, "assets")
+        try:
+            assets = extract_assets(assets_zip_provider, cache_dir)
+        except EXTRACT_ERRORS as e:
+            self.log.warning(
+                "Cannot cache tensorboard assets in %s: %s", cache_dir, e)
+            assets = None
+
+        server = HTTPServer(daemon_application(
+            manager, TensorboardTracer(parent=self), assets))
+        server.add_socket(
+            bind_unix_socket(self.socket_path, mode=self.socket_mode))
+        self.log.info(
+            "TensorBoard daemon listening on %s", self.socket_path)
+        # no logdir is loaded before the loop starts
+        self.drop_privileges()
+        IOLoop.current().start()
+
+    def drop_privileges(self):
+        if os.getuid() != 0:
+            return
+        try:
+            user = pwd.getpwnam(self.user)
+        except KeyError:
+            raise RuntimeError(
+                "TensorboardDaemon.user %r does not exist" % self.user)
+        if user.pw_uid == 0:
+            raise RuntimeError(
+                "TensorboardDaemon.user must not be root, TensorBoard would "
+                "load any logdir with root privileges")
+        os.setgroups(os.getgrouplist(user.pw_name, user.pw_gid))
+        os.setgid(user.pw_gid)
+        os.setuid(user.pw_uid)
+        self.log.info("TensorBoard daemon running as %s", user.pw_name)
+
+
+def peer_uid(sock):
+    """uid of the process on the other end of a Unix socket."""
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+def _permitted(st, uid, gids, mode):
+    if st.st_uid == uid:
+        return st.st_mode & (mode << 6) == mode << 6
+    if st.st_gid in gids:
+        return st.st_mode & (mode << 3) == mode << 3
+    return st.st_mode & mode == mode
+
+
+def _user_gids(uid):
+    try:
+        user = pwd.getpwuid(uid)
+    except KeyError:
+        return None
+    return set(os.getgrouplist(user.pw_name, user.pw_gid))
+
+
+def uid_can_read(uid, path):
+    """Whether ``uid`` may traverse to and list the directory ``path``."""
+    if uid == 0:
+        return True
+    gids = _user_gids(uid)
+    if gids is None:
+        return False
+
+    path = os.path.realpath(path)
+    ancestors = [os.path.dirname(path)]
+    while os.path.dirname(ancestors[-1]) != ancestors[-1]:
+        ancestors.append(os.path.dirname(ancestors[-1]))
+    try:
+        if not all(_permitted(os.stat(p), uid, gids, stat.S_IXOTH)
+                   for p in ancestors):
+            return False
+        return _permitted(
+            os.stat(path), uid, gids, stat.S_IROTH | stat.S_IXOTH)
+    except OSError:
+        return False
+
+
+def _raise(error):
+    raise error
+
+
+def uid_can_read_tree(uid, path):
+    """Whether ``uid`` may read everything TensorBoard loads from the
+    logdir ``path``: its directories, their files and no symlink leading
+    out of it."""
+    if not uid_can_read(uid, path):
+        return False
+    if uid == 0:
+        return True
+    gids = _user_gids(uid)
+
+    root = os.path.realpath(path)
+    try:
+        for dirpath, dirnames, filenames in os.walk(root, onerror=_raise):
+            for name in dirnames + filenames:
+                child = os.path.join(dirpath, name)
+                st = os.lstat(child)
+                if stat.S_ISLNK(st.st_mode):
+                    # symlinks are not walked, their target must be
+                    # inside the logdir where it is checked anyway
+                    target = os.path.realpath(child)
+                    if (target != root and
+                            not target.startswith(root + os.sep)):
+                        return False
+                elif stat.S_ISDIR(st.st_mode):
+                    if not _permitted(
+                            st, uid, gids, stat.S_IROTH | stat.S_IXOTH):
+                        return False
+                elif not _permitted(st, uid, gids, stat.S_IROTH):
+                    return False
+    except OSError:
+        return False
+    return True
+
+
+class LogdirAccess(object):
+    """Users sharing each logdir of the daemon, and the ones who could read
+    its whole tree when it was last checked.
+
+    Trees are walked off the IOLoop, when a user opens a logdir and on the
+    reload thread before each reload, handlers only look the results up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {}
+        self._readers = {}
+
+    def join(self, logdir, uid):
+        """Add ``uid``, whose access to ``logdir`` was just checked."""
+        with self._lock:
+            self._members.setdefault(logdir, set()).add(uid)
+            self._readers.setdefault(logdir, set()).add(uid)
+
+    def leave(self, logdir, uid):
+        """Remove ``uid``, returning whether ``logdir`` has users left."""
+        with self._lock:
+            members = self._members.get(logdir, set())
+            members.discard(uid)
+            self._readers.get(logdir, set()).discard(uid)
+            if members:
+                return True
+            self._members.pop(logdir, None)
+            self._readers.pop(logdir, None)
+            return False
+
+    def is_member(self, logdir, uid):
+        with self._lock:
+            return uid in self._members.get(logdir, ())
+
+    def can_read(self, logdir, uid):
+        with self._lock:
+            return uid in self._readers.get(logdir, ())
+
+    def check(self, logdirs):
+        """Walk ``logdirs`` again for their users, returning whether any of
+        them may still read one, otherwise the reload is skipped."""
+        allowed = False
+        for logdir in logdirs:
+            with self._lock:
+                members = set(self._members.get(logdir, ()))
+            readers = set(
+                uid for uid in members if uid_can_read_tree(uid, logdir))
+            with self._lock:
+                if logdir not in self._members:
+                    continue
+                previous = self._readers.get(logdir, set())
+                # users who joined during the walk were checked on joining
+                readers |= (self._members[logdir] - members) & previous
+                readers &= self._members[logdir]
+                for uid in (previous & members) - readers:
+                    logging.warning(
+                        "TensorBoard logdir %s is no longer readable by "
+                        "uid %d", logdir, uid)
+                self._readers[logdir] = readers
+            allowed = allowed or bool(readers)
+        return allowed
+
+
+class DaemonHandlerMixin(object):
+    """Authenticate notebook servers by the uid of their process."""
+
+    def get_current_user(self):
+        return peer_uid(self.request.connection.stream.socket)
+
+    @property
+    def manager(self):
+        return self.settings["tensorboard_manager"]
+
+    @property
+    def access(self):
+        return self.settings["tensorboard_access"]
+
+    def get_instance(self, name):
+        entry = self.manager.get(name)
+        if entry is None or not self.access.is_member(
+                entry.logdir, self.current_user):
+            raise web.HTTPError(
+                404, "TensorBoard instance not found: %r" % name)
+        return entry
+
+    def write_error(self, status_code, **kwargs):
+        message = self._reason
+        exception = kwargs.get("exc_info", (None, None, None))[1]
+        if isinstance(exception, web.HTTPError) and exception.log_message:
+            message = exception.log_message % exception.args
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"message": message}))
+
+
+def _instance_model(entry):
+    return {
+        'name': entry.name,
+        'logdir': entry.logdir,
+        'reload_time': entry.thread.reload_time,
+    }
+
+
+class DaemonRootHandler(DaemonHandlerMixin, web.RequestHandler):
+
+    def get(self):
+        uid = self.current_user
+        self.finish(json.dumps([
+            _instance_model(entry) for entry in self.manager.values()
+            if self.access.is_member(entry.logdir, uid)]))
+
+    @gen.coroutine
+    def post(self):
+        data = json.loads(self.request.body.decode("utf-8"))
+        logdir = data["logdir"]
+        if not os.path.isabs(logdir):
+            raise web.HTTPError(400, "logdir must be absolute: %r" % logdir)
+        # the resolved path is both checked and loaded and names a single
+        # instance, what changes below it is caught before the next reload
+        logdir = os.path.realpath(logdir)
+        readable = yield self.settings["tensorboard_executor"].submit(
+            uid_can_read_tree, self.current_user, logdir)
+        if not readable:
+            raise web.HTTPError(403, "Permission denied: %r" % logdir)
+
+        # joined first, so the first reload already counts this user
+        self.access.join(logdir, self.current_user)
+        try:
+            entry = self.manager.new_instance(
+                logdir, reload_interval=data.get("reload_interval", None))
+        except Exception:
+            self.access.leave(logdir, self.current_user)
+            raise
+        self.finish(json.dumps(_instance_model(entry)))
+
+
+class DaemonInstanceHandler(DaemonHandlerMixin, web.RequestHandler):
+
+    SUPPORTED_METHODS = ('GET', 'DELETE')
+
+    def get(self, name):
+        self.finish(json.dumps(_instance_model(self.get_instance(name))))
+
+    def delete(self, name):
+        entry = self.get_instance(name)
+        # the instance only goes away with the last user who opened it
+        if not self.access.leave(entry.logdir, self.current_user):
+            self.manager.terminate(name, force=True)
+        self.set_status(204)
+        self.finish()
+
+
+class DaemonAssetHandler(
+        DaemonHandlerMixin, PrecompressedAssetMixin, web.StaticFileHandler):
+
+    def get(self, name, path, include_body=True):
+        self.get_instance(name)
+        return self.get_asset(path, include_body)
+
+    def head(self, name, path):
+        return self.get(name, path, include_body=False)
+
+
+class DaemonTensorboardHandler(DaemonHandlerMixin, web.RequestHandler):
+
+    def get(self, name, path):
+        entry = self.get_instance(name)
+        if not self.access.can_read(entry.logdir, self.current_user):
+            raise web.HTTPError(
+                403, "Permission denied: %r" % entry.logdir)
+        tb_app = self.settings["tensorboard_tracer"].trace(
+            name, path, self.request, entry.tb_app)
+        self.request.path = path or "/"
+        WSGIContainer(tb_app)(self.request)
+
+
+def daemon_application(manager, tracer, assets=None):
+    """The web application of the daemon, serving the instances of
+    ``manager``."""
+    access = LogdirAccess()
+    manager.reload_guard = access.check
+    settings = {
+        "tensorboard_manager": manager,
+        "tensorboard_access": access,
+        "tensorboard_executor": ThreadPoolExecutor(4),
+        "tensorboard_tracer": tracer,
+    }
+    handlers = [
+        (r"/api/tensorboard", DaemonRootHandler),
+        (r"/api/tensorboard/(?P<name>\w+)", DaemonInstanceHandler),
+    ]
+    if assets:
+        handlers.append((
+            asset_route(assets), DaemonAssetHandler, {"path": assets.root}))
+    handlers.append((
+        r"/tensorboard/(?P<name>\w+)(?P<path>(?:/.*)?)",
+        DaemonTensorboardHandler))
+    return web.Application(handlers, **settings)
+
+
+class UnixSocketResolver(Resolver):
+    """Resolve every host to the daemon socket."""
+
+    def initialize(self, socket_path):
+        self.socket_path = socket_path
+
+    @gen.coroutine
+    def resolve(self, host, port, family=socket.AF_UNSPEC):
+        raise gen.Return([(socket.AF_UNIX, self.socket_path)])
+
+
+class DaemonTCPClient(TCPClient):
+    """Only hand out connections to a socket served by ``daemon_uid``, so
+    no other user can stand in for the daemon."""
+
+    def __init__(self, daemon_uid, resolver=None):
+        super(DaemonTCPClient, self).__init__(resolver=resolver)
+        self.daemon_uid = daemon_uid
+
+    @gen.coroutine
+    def connect(self, *args, **kwargs):
+        stream = yield super(DaemonTCPClient, self).connect(*args, **kwargs)
+        uid = peer_uid(stream.socket)
+        if uid != self.daemon_uid:
+            stream.close()
+            raise IOError(
+                "TensorBoard daemon socket served by uid %d, expected %d"
+                % (uid, self.daemon_uid))
+        raise gen.Return(stream)
+
+
+def daemon_client(socket_path, daemon_uid):
+    client = SimpleAsyncHTTPClient(
+        force_instance=True, resolver=UnixSocketResolver(
+            socket_path=socket_path))
+    client.tcp_client = DaemonTCPClient(daemon_uid, resolver=client.resolver)
+    return client
+
+
+class DaemonProxyMixin(object):
+    """Forward the current request to the tensorboard daemon and return its
+    response."""
+
+    @gen.coroutine
+    def forward_to_daemon(self, path, body=None):
+        client = self.settings["tensorboard_daemon_client"]
+        headers = dict(
+            (key, self.request.headers[key])
+            for key in _FORWARDED_REQUEST_HEADERS
+            if key in self.request.headers)
+        url = "http://%s%s" % (DAEMON_HOST, path)
+        if self.request.query:
+            url += "?" + self.request.query
+        request = httpclient.HTTPRequest(
+            url, method=self.request.method, headers=headers,
+            body=self.request.body if body is None else body,
+            allow_nonstandard_methods=True, follow_redirects=False,
+            decompress_response=False)
+
+        try:
+            response = yield client.fetch(request)
+        except httpclient.HTTPError as e:
+            if e.response is None:
+                raise web.HTTPError(503, "TensorBoard daemon unavailable")
+            response = e.response
+        except (IOError, OSError):
+            raise web.HTTPError(503, "TensorBoard daemon unavailable")
+
+        self.set_status(response.code, response.reason)
+        for key in _FORWARDED_RESPONSE_HEADERS:
+            if key in response.headers:
+                self.set_header(key, response.headers[key])
+        if response.body:
+            self.write(response.body)
+        self.finish()
+        raise gen.Return(response)
@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
 
-from tornado import web
+import math
+import time
+
+from tornado import gen, web
 from tornado.wsgi import WSGIContainer
 from notebook.base.handlers import IPythonHandler
 from notebook.utils import url_path_join as ujoin
 from notebook.base.handlers import path_regex
 
+from .assets import (
+    EXTRACT_ERRORS, PrecompressedAssetMixin, asset_cache_dir, asset_route,
+    extract_assets)
+from .daemon import DaemonProxyMixin, TensorboardDaemon, daemon_client
+from .memory import TensorboardMemoryBudget
+from .ratelimit import TensorboardRateLimiter
+from .tracing import TensorboardTracer
+
 notebook_dir = None
 
 
@@ -17,6 +28,17 @@ def load_jupyter_server_extension(nb_app):
 
     web_app = nb_app.web_app
     base_url = web_app.settings['base_url']
+    web_app.settings["tensorboard_rate_limiter"] = (
+        TensorboardRateLimiter(parent=nb_app))
+    web_app.settings["tensorboard_tracer"] = TensorboardTracer(parent=nb_app)
+
+    daemon = TensorboardDaemon(parent=nb_app)
+    if daemon.enabled:
+        web_app.add_handlers('.*$', _daemon_handlers(daemon, web_app))
+        nb_app.log.info(
+            "jupyter_tensorboard extension loaded, using the daemon on %s.",
+            daemon.socket_path)
+        return
 
     try:
         from .tensorboard_manager import manager
@@ -28,10 +50,12 @@ def load_jupyter_server_extension(nb_app):
                 TensorboardErrorHandler),
         ]
     else:
+        manager.memory_budget = TensorboardMemoryBudget(parent=nb_app)
         web_app.settings["tensorboard_manager"] = manager
         from . import api_handlers
 
-        handlers = [
+        handlers = _asset_handlers(nb_app, base_url)
+        handlers += [
             (ujoin(
                 base_url, r"/tensorboard/(?P<name>\w+)%s" % path_regex),
                 TensorboardHandler),
@@ -41,34 +65,133 @@ def load_jupyter_server_extension(nb_app):
             (ujoin(
                 base_url, r"/api/tensorboard/(?P<name>\w+)"),
                 api_handlers.TbInstanceHandler),
+            (ujoin(
+                base_url, r"/api/tensorboard/trace/profile"),
+                api_handlers.TbProfileHandler),
         ]
 
     web_app.add_handlers('.*$', handlers)
     nb_app.log.info("jupyter_tensorboard extension loaded.")
 
 
-class TensorboardHandler(IPythonHandler):
+def _daemon_handlers(daemon, web_app):
+    from . import api_handlers
+
+    base_url = web_app.settings['base_url']
+    web_app.settings["tensorboard_daemon_client"] = daemon_client(
+        daemon.socket_path, daemon.uid)
+    return [
+        (ujoin(
+            base_url, r"/tensorboard/(?P<name>\w+)%s" % path_regex),
+            TensorboardDaemonHandler),
+        (ujoin(
+            base_url, r"/api/tensorboard(?P<path>(?:/\w+)?)"),
+            api_handlers.TbDaemonHandler),
+    ]
+
+
+def _asset_handlers(nb_app, base_url):
+    from .tensorboard_manager import assets_zip_provider
+
+    cache_dir = asset_cache_dir()
+    try:
+        assets = extract_assets(assets_zip_provider, cache_dir)
+    except EXTRACT_ERRORS as e:
+        nb_app.log.warning(
+            "Cannot cache tensorboard assets in %s: %s", cache_dir, e)
+        return []
+    if not assets:
+        return []
+
+    return [
+        (ujoin(base_url, asset_route(assets)),
+            TensorboardAssetHandler, {"path": assets.root}),
+    ]
+
+
+class TensorboardProxyHandler(IPythonHandler):
+    """Common checks before a request reaches a TensorBoard instance."""
+
+    def redirect_to_root(self):
+        uri = self.request.path + "/"
+        if self.request.query:
+            uri += "?" + self.request.query
+        self.redirect(uri, permanent=True)
+
+    def rate_limited(self, name, path):
+        """Answer with 429 and return True if the request is over limit."""
+        limiter = self.settings["tensorboard_rate_limiter"]
+        user = self.current_user or self.request.remote_ip
+        retry_after = limiter.check(str(user), name, path)
+        if retry_after:
+            self.set_status(429)
+            self.set_header("Retry-After", "%d" % math.ceil(retry_after))
+            self.finish("Too many requests to TensorBoard instance %s" % name)
+        return bool(retry_after)
+
+
+class TensorboardHandler(TensorboardProxyHandler):
 
     @web.authenticated
     def get(self, name, path):
 
         if path == "":
-            uri = self.request.path + "/"
-            if self.request.query:
-                uri += "?" + self.request.query
-            self.redirect(uri, permanent=True)
+            self.redirect_to_root()
+            return
+
+        manager = self.settings["tensorboard_manager"]
+        if name not in manager:
+            raise web.HTTPError(404)
+
+        if self.rate_limited(name, path):
             return
 
         self.request.path = (
             path if self.request.query
             else "%s?%s" % (path, self.request.query))
 
-        manager = self.settings["tensorboard_manager"]
-        if name in manager:
-            tb_app = manager[name].tb_app
-            WSGIContainer(tb_app)(self.request)
-        else:
+        tb_app = self.settings["tensorboard_tracer"].trace(
+            name, path, self.request, manager[name].tb_app)
+        WSGIContainer(tb_app)(self.request)
+
+
+class TensorboardAssetHandler(
+        IPythonHandler, PrecompressedAssetMixin, web.StaticFileHandler):
+    """Serve the TensorBoard frontend from the extracted asset cache."""
+
+    @web.authenticated
+    def get(self, name, path, include_body=True):
+        if name not in self.settings["tensorboard_manager"]:
             raise web.HTTPError(404)
+        return self.get_asset(path, include_body)
+
+    def head(self, name, path):
+        return self.get(name, path, include_body=False)
+
+
+class TensorboardDaemonHandler(DaemonProxyMixin, TensorboardProxyHandler):
+    """Forward TensorBoard requests to the host wide daemon."""
+
+    @web.authenticated
+    @gen.coroutine
+    def get(self, name, path):
+
+        if path == "":
+            self.redirect_to_root()
+            return
+
+        if self.rate_limited(name, path):
+            return
+
+        tracer = self.settings["tensorboard_tracer"]
+        start = time.time()
+        response = yield self.forward_to_daemon(
+            "/tensorboard/%s%s" % (name, path))
+        if tracer.enabled:
+            tracer.record(
+                name, path, str(response.code),
+                start - self.request._start_time, time.time() - start,
+                len(response.body or b""))
 
 
 class TensorboardErrorHandler(IPythonHandler):
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import six
+from traitlets import Dict, Int, TraitError, validate
+from traitlets.config import LoggingConfigurable
+
+# reservoirs of the event accumulators that predate ``tensors_by_tag``
+_LEGACY_RESERVOIRS = (
+    "scalars", "images", "audios", "histograms",
+    "compressed_histograms", "tensors",
+)
+
+# rough per event cost of the namedtuple and its step/wall_time
+_EVENT_OVERHEAD = 64
+
+
+def _reservoirs(accumulator):
+    tensors_by_tag = getattr(accumulator, "tensors_by_tag", None)
+    if tensors_by_tag is not None:
+        return list(tensors_by_tag.values())
+    return [
+        getattr(accumulator, name) for name in _LEGACY_RESERVOIRS
+        if hasattr(accumulator, name)]
+
+
+def _event_bytes(event):
+    size = _EVENT_OVERHEAD
+    for value in event:
+        if hasattr(value, "ByteSize"):
+            size += value.ByteSize()
+        elif isinstance(value, bytes):
+            size += len(value)
+        elif isinstance(value, tuple):
+            size += _event_bytes(value)
+    return size
+
+
+def _downsample(items, size):
+    """Keep ``size`` evenly spaced items, always including the last one."""
+    if size == 1:
+        return items[-1:]
+    step = (len(items) - 1) / float(size - 1)
+    return [items[int(round(i * step))] for i in range(size)]
+
+
+def run_bytes(accumulator):
+    """Approximate number of bytes held by the reservoirs of a run."""
+    total = 0
+    for reservoir in _reservoirs(accumulator):
+        with reservoir._mutex:
+            for bucket in reservoir._buckets.values():
+                with bucket._mutex:
+                    total += sum(_event_bytes(e) for e in bucket.items)
+    return total
+
+
+class TensorboardMemoryBudget(LoggingConfigurable):
+    """Bound the events a TensorBoard instance keeps in memory.
+
+    ``samples_per_plugin`` is handed to TensorBoard to size the reservoir of
+    every tag up front. When ``max_instance_bytes`` is set, the runs of an
+    instance are measured after each reload and, while the instance is over
+    budget, the reservoirs of its largest runs are halved.
+    """
+
+    samples_per_plugin = Dict(config=True, help=(
+        "Number of samples TensorBoard keeps per tag for each plugin, "
+        "e.g. {'images': 5, 'histograms': 100}. Plugins not listed use "
+        "the TensorBoard defaults."))
+
+    max_instance_bytes = Int(0, config=True, help=(
+        "Approximate number of bytes of events a TensorBoard instance may "
+        "hold. 0 disables the budget."))
+
+    min_samples_per_tag = Int(10, min=1, config=True, help=(
+        "Reservoirs are never shrunk below this number of samples per tag."))
+
+    @validate("samples_per_plugin")
+    def _validate_samples_per_plugin(self, proposal):
+        for plugin, samples in six.iteritems(proposal["value"]):
+            if (isinstance(samples, bool) or
+                    not isinstance(samples, six.integer_types) or
+                    samples < 0):
+                raise TraitError(
+                    "samples_per_plugin[%r] must be a non negative "
+                    "integer, got %r" % (plugin, samples))
+        return proposal["value"]
+
+    def samples_per_plugin_flag(self):
+        return ",".join(
+            "%s=%d" % (plugin, samples)
+            for plugin, samples in sorted(self.samples_per_plugin.items()))
+
+    def _shrink(self, accumulator):
+        freed = 0
+        for reservoir in _reservoirs(accumulator):
+            with reservoir._mutex:
+                for bucket in reservoir._buckets.values():
+                    with bucket._mutex:
+                        freed += self._shrink_bucket(bucket)
+        return freed
+
+    def _shrink_bucket(self, bucket):
+        size = max(self.min_samples_per_tag, len(bucket.items) // 2)
+        if len(bucket.items) <= size:
+            return 0
+        before = sum(_event_bytes(e) for e in bucket.items)
+        bucket.items = _downsample(bucket.items, size)
+        bucket._max_size = size
+        return before - sum(_event_bytes(e) for e in bucket.items)
+
+    def enforce(self, multiplexer):
+        """Shrink the largest runs of ``multiplexer`` until it fits the
+        budget, returning the approximate bytes held per run."""
+        if not self.max_instance_bytes:
+            return {}
+
+        sizes = dict(
+            (run, run_bytes(multiplexer.GetAccumulator(run)))
+            for run in multiplexer.Runs())
+        total = sum(sizes.values())
+        for run in sorted(sizes, key=sizes.get, reverse=True):
+            if total <= self.max_instance_bytes:
+                break
+            freed = self._shrink(multiplexer.GetAccumulator(run))
+            if freed:
+                self.log.info(
+                    "TensorBoard run %s over memory budget, "
+                    "freed about %d bytes", run, freed)
+            sizes[run] -= freed
+            total -= freed
+        return sizes
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from traitlets import Float, Int, List
+from traitlets.config import LoggingConfigurable
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost, reserve=0):
+        """Seconds to wait before ``cost`` tokens can be taken while still
+        leaving ``reserve`` tokens in the bucket, 0 if they can be now."""
+        self._refill()
+        missing = cost + reserve - self.tokens
+        return missing / self.rate if missing > 0 else 0
+
+    def take(self, cost):
+        self.tokens -= cost
+
+
+class TensorboardRateLimiter(LoggingConfigurable):
+    """Token bucket limits on requests proxied to TensorBoard instances.
+
+    Every request takes tokens from the bucket of the requesting user and
+    from the bucket of the instance it targets. Requests to the plugins in
+    ``expensive_plugins`` cost more and must leave ``reserve`` of each bucket
+    untouched, so lightweight requests keep being served when a single tab
+    floods the server.
+    """
+
+    user_rate = Float(0, config=True, help=(
+        "Requests per second each user may send to TensorBoard instances. "
+        "0 disables the per-user limit."))
+
+    user_burst = Int(60, min=1, config=True, help=(
+        "Number of requests a user may send at once before being limited."))
+
+    instance_rate = Float(0, config=True, help=(
+        "Requests per second a single TensorBoard instance accepts. "
+        "0 disables the per-instance limit."))
+
+    instance_burst = Int(120, min=1, config=True, help=(
+        "Number of requests an instance accepts at once before being "
+        "limited."))
+
+    expensive_plugins = List(
+        ["graphs", "profile", "projector"], config=True, help=(
+            "TensorBoard plugins whose data routes are expensive to serve."))
+
+    expensive_cost = Int(5, min=1, config=True, help=(
+        "Tokens consumed by a request to one of the expensive plugins."))
+
+    reserve = Float(0.2, min=0., max=1., config=True, help=(
+        "Fraction of each bucket that expensive requests may not use, "
+        "kept for lightweight requests. It is capped so that a full "
+        "bucket always admits one expensive request."))
+
+    def __init__(self, **kwargs):
+        super(TensorboardRateLimiter, self).__init__(**kwargs)
+        self._user_buckets = {}
+        self._instance_buckets = {}
+
+    def _is_expensive(self, path):
+        parts = path.strip("/").split("/")
+        return (len(parts) > 2 and parts[:2] == ["data", "plugin"] and
+                parts[2] in self.expensive_plugins)
+
+    def _buckets(self, user, instance):
+        buckets = []
+        if self.user_rate > 0:
+            if user not in self._user_buckets:
+                self._user_buckets[user] = TokenBucket(
+                    self.user_rate, self.user_burst)
+            buckets.append(self._user_buckets[user])
+        if self.instance_rate > 0:
+            if instance not in self._instance_buckets:
+                self._instance_buckets[instance] = TokenBucket(
+                    self.instance_rate, self.instance_burst)
+            buckets.append(self._instance_buckets[instance])
+        return buckets
+
+    def check(self, user, instance, path):
+        """Account a request of ``user`` for ``path`` on ``instance``.
+
+        Returns 0 if the request may proceed, otherwise the number of
+        seconds the client should wait before retrying.
+        """
+        buckets = self._buckets(user, instance)
+        if not buckets:
+            return 0
+
+        if self._is_expensive(path):
+            # a full bucket must always admit one expensive request,
+            # otherwise it would be refused forever
+            costs = [min(self.expensive_cost, b.burst) for b in buckets]
+            reserves = [
+                min(self.reserve * b.burst, b.burst - cost)
+                for b, cost in zip(buckets, costs)]
+        else:
+            costs = [1] * len(buckets)
+            reserves = [0] * len(buckets)
+
+        delay = max(
+            bucket.delay(cost, reserve)
+            for bucket, cost, reserve in zip(buckets, costs, reserves))
+        if delay:
+            self.log.debug(
+                "TensorBoard request %s on instance %s by %s limited",
+                path, instance, user)
+            return delay
+
+        for bucket, cost in zip(buckets, costs):
+            bucket.take(cost)
+        return 0
+
+    def forget_instance(self, instance):
+        self._instance_buckets.pop(instance, None)
@@ -32,13 +32,18 @@ try:
         logging.debug("Tensorboard 1.10 or above series detected")
         from tensorboard import program
 
-        def create_tb_app(logdir, reload_interval, purge_orphaned_data):
+        assets_zip_provider = program.TensorBoard().assets_zip_provider
+
+        def create_tb_app(logdir, reload_interval, purge_orphaned_data,
+                          samples_per_plugin=""):
             argv = [
                         "",
                         "--logdir", logdir,
                         "--reload_interval", str(reload_interval),
                         "--purge_orphaned_data", str(purge_orphaned_data),
                    ]
+            if samples_per_plugin:
+                argv += ["--samples_per_plugin", samples_per_plugin]
             tensorboard = program.TensorBoard()
             tensorboard.configure(argv)
             return application.standard_tensorboard_wsgi(
@@ -48,7 +53,12 @@ try:
     else:
         logging.debug("Tensorboard 0.4.x series detected")
 
-        def create_tb_app(logdir, reload_interval, purge_orphaned_data):
+        assets_zip_provider = (
+            default.get_assets_zip_provider()
+            if hasattr(default, "get_assets_zip_provider") else None)
+
+        def create_tb_app(logdir, reload_interval, purge_orphaned_data,
+                          samples_per_plugin=""):
             return application.standard_tensorboard_wsgi(
                 logdir=logdir, reload_interval=reload_interval,
                 purge_orphaned_data=purge_orphaned_data,
@@ -68,6 +78,8 @@ except ImportError:
     from tensorboard.plugins.text import text_plugin
     logging.debug("Tensorboard 0.3.x series detected")
 
+    assets_zip_provider = None
+
     _plugins = [
                 core_plugin.CorePlugin,
                 scalars_plugin.ScalarsPlugin,
@@ -81,7 +93,8 @@ except ImportError:
                 profile_plugin.ProfilePlugin,
             ]
 
-    def create_tb_app(logdir, reload_interval, purge_orphaned_data):
+    def create_tb_app(logdir, reload_interval, purge_orphaned_data,
+                      samples_per_plugin=""):
         return application.standard_tensorboard_wsgi(
             logdir=logdir, reload_interval=reload_interval,
             purge_orphaned_data=purge_orphaned_data,
@@ -89,20 +102,39 @@ except ImportError:
 
 
 from .handlers import notebook_dir   # noqa
+from .memory import TensorboardMemoryBudget   # noqa
 
 TensorBoardInstance = namedtuple(
     'TensorBoardInstance', ['name', 'logdir', 'tb_app', 'thread'])
 
 
+def reload_multiplexer_within_budget(multiplexer, path_to_run):
+    """Reload ``multiplexer`` and return the approximate bytes per run,
+    empty when no memory budget is configured."""
+    application.reload_multiplexer(multiplexer, path_to_run)
+    run_bytes = manager.memory_budget.enforce(multiplexer)
+    if run_bytes:
+        logging.debug(
+            "TensorBoard %s holds about %d bytes: %r",
+            ",".join(sorted(path_to_run)), sum(run_bytes.values()),
+            run_bytes)
+    return run_bytes
+
+
 def start_reloading_multiplexer(multiplexer, path_to_run, reload_interval):
     def _ReloadForever():
         current_thread = threading.currentThread()
         while not current_thread.stop:
-            application.reload_multiplexer(multiplexer, path_to_run)
-            current_thread.reload_time = time.time()
+            if manager.may_reload(path_to_run):
+                current_thread.run_bytes = reload_multiplexer_within_budget(
+                    multiplexer, path_to_run)
+                current_thread.reload_time = time.time()
             time.sleep(reload_interval)
-    thread = threading.Thread(target=_ReloadForever)
+    thread = threading.Thread(
+        target=_ReloadForever,
+        name="tensorboard-reload-%s" % ",".join(sorted(path_to_run)))
     thread.reload_time = None
+    thread.run_bytes = {}
     thread.stop = False
     thread.daemon = True
     thread.start()
@@ -144,7 +176,7 @@ def TensorBoardWSGIApp_2x(
         thread = start_reloading_multiplexer(
             multiplexer, path_to_run, reload_interval)
     else:
-        application.reload_multiplexer(multiplexer, path_to_run)
+        reload_multiplexer_within_budget(multiplexer, path_to_run)
         thread = None
 
     db_uri = None
@@ -185,7 +217,7 @@ def TensorBoardWSGIApp_1x(
         thread = start_reloading_multiplexer(
             multiplexer, path_to_run, reload_interval)
     else:
-        application.reload_multiplexer(multiplexer, path_to_run)
+        reload_multiplexer_within_budget(multiplexer, path_to_run)
         thread = None
     tb_app = application.TensorBoardWSGI(plugins)
     manager.add_instance(logdir, tb_app, thread)
@@ -202,6 +234,10 @@ class TensorboardManger(dict):
 
     def __init__(self):
         self._logdir_dict = {}
+        self.memory_budget = TensorboardMemoryBudget()
+        # called on the reload thread with the logdirs of an instance before
+        # each of its reloads, which is skipped when it returns False
+        self.reload_guard = None
 
     def _next_available_name(self):
         for n in itertools.count(start=1):
@@ -218,10 +254,16 @@ class TensorboardManger(dict):
             reload_interval = reload_interval or 30
             create_tb_app(
                 logdir=logdir, reload_interval=reload_interval,
-                purge_orphaned_data=purge_orphaned_data)
+                purge_orphaned_data=purge_orphaned_data,
+                samples_per_plugin=(
+                    self.memory_budget.samples_per_plugin_flag()))
 
         return self._logdir_dict[logdir]
 
+    def may_reload(self, path_to_run):
+        return (self.reload_guard is None or
+                self.reload_guard(list(path_to_run)))
+
     def add_instance(self, logdir, tb_application, thread):
         name = self._next_available_name()
         instance = TensorBoardInstance(name, logdir, tb_application, thread)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import sys
+import threading
+import time
+
+from traitlets import Bool, Float, Int
+from traitlets.config import LoggingConfigurable
+
+
+def sample_stacks(seconds, interval):
+    """Sample the stacks of every thread for ``seconds``.
+
+    Returns the samples in the folded format read by flame graph tools,
+    one ``thread;outer frame;...;inner frame count`` line per stack.
+    """
+    counts = collections.Counter()
+    current = threading.current_thread().ident
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        names = dict((t.ident, t.name) for t in threading.enumerate())
+        for ident, frame in sys._current_frames().items():
+            if ident == current:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (
+                    code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "".join(
+        "%s %d\n" % (stack, count) for stack, count in sorted(counts.items()))
+
+
+class TensorboardTracer(LoggingConfigurable):
+    """Time the requests served by TensorBoard instances.
+
+    Each traced request records the time it waited before its WSGI app ran,
+    the time spent in the TensorBoard WSGI app and the bytes it returned.
+    Requests forwarded to the daemon record the round trip to it instead.
+    Spans are logged at debug level, and at warning level once a request
+    takes longer than ``slow_request_threshold``.
+    """
+
+    enabled = Bool(False, config=True, help=(
+        "Trace requests to TensorBoard instances and allow profiling the "
+        "server through /api/tensorboard/trace/profile. Profiling is not "
+        "available when the instances are served by the daemon."))
+
+    slow_request_threshold = Float(1.0, config=True, help=(
+        "Requests taking longer than this many seconds are logged as slow."))
+
+    max_profile_seconds = Int(60, config=True, help=(
+        "Longest profile that can be requested, in seconds."))
+
+    sample_interval = Float(0.01, config=True, help=(
+        "Seconds between two samples of the thread stacks when profiling."))
+
+    def __init__(self, **kwargs):
+        super(TensorboardTracer, self).__init__(**kwargs)
+        self.profiling = False
+
+    def trace(self, name, path, request, tb_app):
+        """Wrap ``tb_app`` to record a span for ``request`` of ``path`` on
+        instance ``name``."""
+        if not self.enabled:
+            return tb_app
+
+        def traced_app(environ, start_response):
+            status = []
+
+            def _start_response(code, headers, exc_info=None):
+                status.append(code.split(" ", 1)[0])
+                return start_response(code, headers, exc_info)
+
+            start = time.time()
+            # the wait lasts until the WSGI app runs, not until the handler
+            queue_time = start - request._start_time
+            result = tb_app(environ, _start_response)
+            try:
+                body = list(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            self.record(
+                name, path, status[0] if status else "-", queue_time,
+                time.time() - start, sum(len(chunk) for chunk in body))
+            return body
+
+        return traced_app
+
+    def record(self, name, path, status, queue_time, wsgi_time, nbytes):
+        total = queue_time + wsgi_time
+        if total >= self.slow_request_threshold:
+            log = self.log.warning
+            message = "Slow TensorBoard request"
+        else:
+            log = self.log.debug
+            message = "TensorBoard request"
+        log("%s %s %s on instance %s: queue %.3fs, wsgi %.3fs, %d bytes",
+            message, status, path, name, queue_time, wsgi_time, nbytes)
@@ -0,0 +1,35 @@
+# -*- coding:utf-8 -*-
+
+import io
+import re
+
+import pytest
+
+from jupyter_tensorboard.assets import (
+    EXTRACT_ERRORS, TensorboardAssets, accepted_encodings, asset_route,
+    extract_assets)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("") == set()
+    assert accepted_encodings("gzip, deflate, br") == set(
+        ["gzip", "deflate", "br"])
+    assert accepted_encodings("br;q=1.0, GZIP;q=0.5") == set(["br", "gzip"])
+
+
+def test_accepted_encodings_refused():
+    for refused in ("q=0", "q=0.0", "q=0.00", " q = 0 ", "q=bogus"):
+        assert accepted_encodings("gzip;%s, br" % refused) == set(["br"])
+
+
+def test_extract_broken_zip(tmpdir):
+    with pytest.raises(EXTRACT_ERRORS):
+        extract_assets(lambda: io.BytesIO(b"not a zip"), str(tmpdir))
+
+
+def test_asset_route():
+    route = re.compile(asset_route(
+        TensorboardAssets("/assets", frozenset(["index.js", "a/b.css"]))))
+    match = route.match("/tensorboard/1/a/b.css")
+    assert match.group("name", "path") == ("1", "a/b.css")
+    assert not route.match("/tensorboard/1/aXb.css")
@@ -0,0 +1,279 @@
+# -*- coding:utf-8 -*-
+
+import json
+import os
+import pwd
+import shutil
+import tempfile
+from collections import namedtuple
+from unittest import mock
+
+import pytest
+from tornado import gen, web
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_unix_socket
+from tornado.testing import AsyncTestCase, gen_test
+
+from jupyter_tensorboard.daemon import (
+    DaemonHandlerMixin, DaemonProxyMixin, daemon_application, daemon_client,
+    peer_uid, uid_can_read, uid_can_read_tree)
+from jupyter_tensorboard.tracing import TensorboardTracer
+
+
+@pytest.fixture
+def nobody():
+    try:
+        uid = pwd.getpwnam("nobody").pw_uid
+    except KeyError:
+        pytest.skip("no nobody user")
+    if uid == os.getuid():
+        pytest.skip("running as nobody")
+    return uid
+
+
+@pytest.fixture
+def root_dir():
+    # pytest's tmpdir lives under a directory only its owner can enter
+    path = tempfile.mkdtemp()
+    os.chmod(path, 0o755)
+    yield path
+    shutil.rmtree(path)
+
+
+def test_uid_can_read(root_dir, nobody):
+    shared = os.path.join(root_dir, "shared")
+    private = os.path.join(root_dir, "private")
+    os.mkdir(shared, 0o755)
+    os.mkdir(private, 0o700)
+    os.mkdir(os.path.join(private, "logs"), 0o755)
+
+    assert uid_can_read(nobody, shared)
+    assert not uid_can_read(nobody, private)
+    assert not uid_can_read(nobody, os.path.join(private, "logs"))
+    assert not uid_can_read(nobody, os.path.join(root_dir, "missing"))
+    assert uid_can_read(os.getuid(), private)
+
+
+def test_uid_can_read_tree(root_dir, nobody):
+    logdir = os.path.join(root_dir, "logs")
+    os.mkdir(logdir, 0o755)
+    os.mkdir(os.path.join(logdir, "run"), 0o755)
+    with open(os.path.join(logdir, "run", "events"), "w"):
+        pass
+    os.symlink(os.path.join(logdir, "run"), os.path.join(logdir, "alias"))
+    assert uid_can_read_tree(nobody, logdir)
+
+    os.chmod(os.path.join(logdir, "run", "events"), 0o600)
+    assert not uid_can_read_tree(nobody, logdir)
+    os.chmod(os.path.join(logdir, "run", "events"), 0o644)
+
+    os.mkdir(os.path.join(logdir, "private"), 0o700)
+    assert not uid_can_read_tree(nobody, logdir)
+    os.rmdir(os.path.join(logdir, "private"))
+
+    os.symlink(root_dir, os.path.join(logdir, "escape"))
+    assert not uid_can_read_tree(nobody, logdir)
+    assert uid_can_read_tree(os.getuid(), logdir)
+
+
+Instance = namedtuple("Instance", ["name", "logdir", "tb_app", "thread"])
+
+
+class StubThread(object):
+    reload_time = None
+
+
+class StubManager(dict):
+
+    def __init__(self):
+        self.terminated = []
+
+    def new_instance(self, logdir, reload_interval):
+        for entry in self.values():
+            if entry.logdir == logdir:
+                return entry
+        name = str(len(self) + len(self.terminated) + 1)
+        self[name] = Instance(name, logdir, None, StubThread())
+        return self[name]
+
+    def terminate(self, name, force=True):
+        self.terminated.append(name)
+        del self[name]
+
+
+def _test_uid(self):
+    # stands in for SO_PEERCRED, which only ever reports the test's own uid
+    uid = self.request.headers.get("X-Test-Uid")
+    if uid is None:
+        return peer_uid(self.request.connection.stream.socket)
+    return int(uid)
+
+
+class ForwardHandler(DaemonProxyMixin, web.RequestHandler):
+
+    SUPPORTED_METHODS = ('GET', 'POST', 'DELETE')
+
+    @gen.coroutine
+    def get(self, path):
+        yield self.forward_to_daemon(path)
+
+    post = delete = get
+
+
+class TestDaemon(AsyncTestCase):
+
+    def setUp(self):
+        super(TestDaemon, self).setUp()
+        self.uids = [
+            user.pw_uid for user in pwd.getpwall() if user.pw_uid != 0][:2]
+        if len(self.uids) < 2:
+            self.skipTest("needs two non root users")
+        patcher = mock.patch.object(
+            DaemonHandlerMixin, "get_current_user", _test_uid)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.root = tempfile.mkdtemp()
+        os.chmod(self.root, 0o755)
+        self.logdir = os.path.join(self.root, "logs")
+        os.mkdir(self.logdir, 0o755)
+        self.manager = StubManager()
+
+        socket_path = os.path.join(self.root, "daemon.sock")
+        self.server = HTTPServer(daemon_application(
+            self.manager, TensorboardTracer()))
+        self.server.add_socket(bind_unix_socket(socket_path))
+        self.client = daemon_client(socket_path, os.getuid())
+
+        front_path = os.path.join(self.root, "front.sock")
+        self.front = HTTPServer(web.Application(
+            [(r"(/.*)", ForwardHandler)],
+            tensorboard_daemon_client=self.client))
+        self.front.add_socket(bind_unix_socket(front_path))
+        self.front_client = daemon_client(front_path, os.getuid())
+
+    def tearDown(self):
+        self.front_client.close()
+        self.client.close()
+        self.front.stop()
+        self.server.stop()
+        shutil.rmtree(self.root)
+        super(TestDaemon, self).tearDown()
+
+    @gen.coroutine
+    def fetch(self, path, uid, method="GET", body=None):
+        response = yield self.client.fetch(
+            "http://daemon" + path, method=method, body=body,
+            headers={"X-Test-Uid": str(uid)}, raise_error=False,
+            allow_nonstandard_methods=True)
+        raise gen.Return(response)
+
+    @gen.coroutine
+    def open_logdir(self, uid, logdir):
+        response = yield self.fetch(
+            "/api/tensorboard", uid, method="POST",
+            body=json.dumps({"logdir": logdir}))
+        raise gen.Return(response)
+
+    @gen_test
+    def test_instances_are_shared_and_listed_per_user(self):
+        alice, bob = self.uids
+        response = yield self.open_logdir(alice, self.logdir)
+        assert response.code == 200
+        name = json.loads(response.body.decode())["name"]
+
+        response = yield self.fetch("/api/tensorboard", bob)
+        assert json.loads(response.body.decode()) == []
+        response = yield self.fetch("/api/tensorboard/" + name, bob)
+        assert response.code == 404
+
+        response = yield self.open_logdir(bob, self.logdir + "/")
+        assert json.loads(response.body.decode())["name"] == name
+        assert len(self.manager) == 1
+        response = yield self.fetch("/api/tensorboard", bob)
+        assert [m["name"] for m in json.loads(response.body.decode())] == [
+            name]
+
+    @gen_test
+    def test_delete_terminates_with_last_member(self):
+        alice, bob = self.uids
+        response = yield self.open_logdir(alice, self.logdir)
+        name = json.loads(response.body.decode())["name"]
+        yield self.open_logdir(bob, self.logdir)
+
+        response = yield self.fetch(
+            "/api/tensorboard/" + name, alice, method="DELETE")
+        assert response.code == 204
+        assert self.manager.terminated == []
+        response = yield self.fetch("/api/tensorboard/" + name, alice)
+        assert response.code == 404
+
+        response = yield self.fetch(
+            "/api/tensorboard/" + name, bob, method="DELETE")
+        assert response.code == 204
+        assert self.manager.terminated == [name]
+
+    @gen_test
+    def test_open_refused(self):
+        alice, _ = self.uids
+        private = os.path.join(self.root, "private")
+        os.mkdir(private, 0o700)
+
+        response = yield self.open_logdir(alice, private)
+        assert response.code == 403
+        assert "Permission denied" in json.loads(
+            response.body.decode())["message"]
+
+        response = yield self.open_logdir(alice, "logs")
+        assert response.code == 400
+        assert self.manager == {}
+
+    @gen_test
+    def test_reload_check_stops_serving(self):
+        alice, _ = self.uids
+        response = yield self.open_logdir(alice, self.logdir)
+        name = json.loads(response.body.decode())["name"]
+        assert self.manager.reload_guard([self.logdir])
+
+        os.mkdir(os.path.join(self.logdir, "private"), 0o700)
+        assert not self.manager.reload_guard([self.logdir])
+        response = yield self.fetch(
+            "/tensorboard/%s/data/runs" % name, alice)
+        assert response.code == 403
+        response = yield self.fetch("/api/tensorboard/" + name, alice)
+        assert response.code == 200
+
+        os.rmdir(os.path.join(self.logdir, "private"))
+        assert self.manager.reload_guard([self.logdir])
+        assert not self.manager.reload_guard([self.root])
+
+    @gen_test
+    def test_forward_to_daemon(self):
+        response = yield self.front_client.fetch(
+            "http://front/api/tensorboard", method="POST",
+            body=json.dumps({"logdir": "logs"}), raise_error=False)
+        assert response.code == 400
+        assert response.headers["Content-Type"] == "application/json"
+        assert "must be absolute" in json.loads(
+            response.body.decode())["message"]
+
+        response = yield self.front_client.fetch(
+            "http://front/api/tensorboard", method="POST",
+            body=json.dumps({"logdir": self.logdir}))
+        assert json.loads(response.body.decode())["logdir"] == self.logdir
+
+        response = yield self.front_client.fetch(
+            "http://front/api/tensorboard")
+        etag = response.headers["Etag"]
+        response = yield self.front_client.fetch(
+            "http://front/api/tensorboard", raise_error=False,
+            headers={"If-None-Match": etag})
+        assert response.code == 304
+        assert response.headers["Etag"] == etag
+
+    @gen_test
+    def test_forward_refuses_other_daemon_uid(self):
+        self.client.tcp_client.daemon_uid = self.uids[0]
+        response = yield self.front_client.fetch(
+            "http://front/api/tensorboard", raise_error=False)
+        assert response.code == 503
@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+
+from collections import namedtuple
+
+import pytest
+from tensorboard.backend.event_processing import reservoir
+from traitlets import TraitError
+
+from jupyter_tensorboard.memory import TensorboardMemoryBudget, run_bytes
+
+Event = namedtuple("Event", ["wall_time", "step", "data"])
+
+
+class FakeAccumulator(object):
+
+    def __init__(self, tags, steps, size):
+        self.tensors_by_tag = {}
+        for tag in tags:
+            self.tensors_by_tag[tag] = reservoir.Reservoir(size=0)
+            for step in range(steps):
+                self.tensors_by_tag[tag].AddItem(
+                    tag, Event(0., step, b"x" * size))
+
+
+class FakeMultiplexer(object):
+
+    def __init__(self, accumulators):
+        self.accumulators = accumulators
+
+    def Runs(self):
+        return dict((run, {}) for run in self.accumulators)
+
+    def GetAccumulator(self, run):
+        return self.accumulators[run]
+
+
+def test_samples_per_plugin_flag():
+    budget = TensorboardMemoryBudget(
+        samples_per_plugin={"images": 5, "histograms": 100})
+    assert budget.samples_per_plugin_flag() == "histograms=100,images=5"
+
+
+def test_budget_shrinks_largest_runs():
+    small = FakeAccumulator(["loss"], 100, 10)
+    large = FakeAccumulator(["image"], 100, 10000)
+    multiplexer = FakeMultiplexer({"small": small, "large": large})
+    small_bytes = run_bytes(small)
+
+    budget = TensorboardMemoryBudget(max_instance_bytes=600000)
+    sizes = budget.enforce(multiplexer)
+
+    assert sum(sizes.values()) <= 600000
+    assert sizes["small"] == run_bytes(small) == small_bytes
+    assert sizes["large"] == run_bytes(large)
+    items = large.tensors_by_tag["image"].Items("image")
+    assert len(items) == 50
+    assert items[-1].step == 99
+
+
+def test_budget_keeps_min_samples():
+    accumulator = FakeAccumulator(["image"], 20, 10000)
+    multiplexer = FakeMultiplexer({"run": accumulator})
+    budget = TensorboardMemoryBudget(
+        max_instance_bytes=1, min_samples_per_tag=10)
+    budget.enforce(multiplexer)
+    budget.enforce(multiplexer)
+    assert len(accumulator.tensors_by_tag["image"].Items("image")) == 10
+
+
+def test_samples_per_plugin_must_be_integers():
+    for value in ({"images": "all"}, {"images": -1}, {"images": 1.5}):
+        with pytest.raises(TraitError):
+            TensorboardMemoryBudget(samples_per_plugin=value)
+
+
+def test_min_samples_per_tag_keeps_a_sample():
+    for value in (0, -1):
+        with pytest.raises(TraitError):
+            TensorboardMemoryBudget(min_samples_per_tag=value)
@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+
+from jupyter_tensorboard.ratelimit import TensorboardRateLimiter, TokenBucket
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=4, clock=clock)
+    assert bucket.delay(4) == 0
+    bucket.take(4)
+    assert bucket.delay(1) == 0.5
+
+    clock.now = 10
+    assert bucket.delay(4) == 0
+    assert bucket.tokens == 4
+
+
+def test_rate_limiter_disabled_by_default():
+    limiter = TensorboardRateLimiter()
+    for _ in range(1000):
+        assert limiter.check("user", "1", "/data/plugin/graphs/graph") == 0
+
+
+def test_rate_limiter_keeps_reserve_for_lightweight_requests():
+    limiter = TensorboardRateLimiter(
+        user_rate=0.01, user_burst=10, expensive_cost=4, reserve=0.2)
+    expensive = "/data/plugin/graphs/graph"
+    light = "/data/plugin/scalars/tags"
+
+    assert limiter.check("user", "1", expensive) == 0
+    assert limiter.check("user", "1", expensive) == 0
+    # two tokens left, all of them reserved for lightweight requests
+    assert limiter.check("user", "1", expensive) > 0
+    assert limiter.check("user", "1", light) == 0
+    assert limiter.check("user", "1", light) == 0
+    assert limiter.check("user", "1", light) > 0
+
+    # other users have their own bucket
+    assert limiter.check("other", "1", expensive) == 0
+
+
+def test_rate_limiter_per_instance():
+    limiter = TensorboardRateLimiter(instance_rate=0.01, instance_burst=2)
+    assert limiter.check("a", "1", "/") == 0
+    assert limiter.check("b", "1", "/") == 0
+    assert limiter.check("c", "1", "/") > 0
+    assert limiter.check("c", "2", "/") == 0
+
+    limiter.forget_instance("1")
+    assert limiter.check("c", "1", "/") == 0
+
+
+def test_rate_limiter_full_bucket_admits_expensive_request():
+    expensive = "/data/plugin/graphs/graph"
+    for burst, cost in ((5, 5), (5, 8), (10, 9)):
+        limiter = TensorboardRateLimiter(
+            user_rate=0.01, user_burst=burst, expensive_cost=cost)
+        assert limiter.check("user", "1", expensive) == 0
+        assert limiter.check("user", "1", expensive) > 0
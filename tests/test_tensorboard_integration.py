@@ -98,6 +98,13 @@ class TestJupyterExtension(AsyncHTTPTestCase):
         response = self.fetch('/tensorboard/1/#graphs')
         assert response.code == 200
 
+        response = self.fetch(
+            '/tensorboard/1/index.js',
+            headers={"Accept-Encoding": "gzip"},
+            decompress_response=False)
+        assert response.code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+
         response = self.fetch('/tensorboard/1/data/plugins_listing')
         plugins_list = json.loads(response.body.decode())
         assert plugins_list["graphs"]
@@ -0,0 +1,51 @@
+# -*- coding:utf-8 -*-
+
+import threading
+import time
+
+from jupyter_tensorboard.tracing import TensorboardTracer, sample_stacks
+
+
+def wsgi_app(environ, start_response):
+    start_response("404 Not Found", [("Content-Type", "text/plain")])
+    return [b"not", b"found"]
+
+
+class Request(object):
+    pass
+
+
+def test_trace_disabled_returns_app():
+    tracer = TensorboardTracer()
+    assert tracer.trace("1", "/data/runs", None, wsgi_app) is wsgi_app
+
+
+def test_trace_records_span():
+    spans = []
+    tracer = TensorboardTracer(enabled=True)
+    tracer.record = lambda *args: spans.append(args)
+
+    request = Request()
+    request._start_time = time.time() - 0.5
+    app = tracer.trace("1", "/data/runs", request, wsgi_app)
+    body = app({}, lambda status, headers, exc_info=None: None)
+
+    assert body == [b"not", b"found"]
+    name, path, status, queue_time, wsgi_time, nbytes = spans[0]
+    assert (name, path, status, nbytes) == ("1", "/data/runs", "404", 8)
+    assert queue_time >= 0.5
+    assert wsgi_time >= 0
+
+
+def test_sample_stacks_includes_other_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, name="tensorboard-reload-x")
+    thread.start()
+    try:
+        folded = sample_stacks(0.05, 0.01)
+    finally:
+        stop.set()
+        thread.join()
+    assert any(
+        line.startswith("tensorboard-reload-x;")
+        for line in folded.splitlines())